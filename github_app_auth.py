@@ -1,10 +1,52 @@
 import os
+import threading
 import time
+from datetime import datetime
 import requests
 import jwt  # pyjwt
 
+from tools._http import SYNC_SESSION
+
+try:
+    import orjson
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    def _json_loads(data):
+        return orjson.loads(data)
+except ImportError:
+    import json
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    def _json_loads(data):
+        return json.loads(data)
+
 GITHUB_API = "https://api.github.com"
 
+# Sent on every GitHub call; callers' headers (e.g. a raw Accept) win.
+GITHUB_HEADERS = {"Accept": "application/vnd.github+json"}
+
+
+def get_session() -> requests.Session:
+    """The shared HTTP session (single seam for swapping in a mock)."""
+    return SYNC_SESSION
+
+
+# Installation tokens live ~60 minutes and app JWTs up to 10, so both are
+# cached and only refreshed shortly before they expire.
+TOKEN_EXPIRY_MARGIN_S = 120
+JWT_TTL_S = 8 * 60
+_TOKEN_CACHE = {"token": None, "exp": 0.0}
+_JWT_CACHE = {"token": None, "exp": 0.0}
+_TOKEN_LOCK = threading.Lock()
+
+# Below this many remaining core requests, wait for the window to reset
+# instead of running into 403s.
+MIN_RATE_BUDGET = 50
+
 
 def _get_env(name: str) -> str:
     v = os.getenv(name)
@@ -14,6 +56,9 @@ def _get_env(name: str) -> str:
 
 
 def _github_app_jwt() -> str:
+    if _JWT_CACHE["token"] and time.time() < _JWT_CACHE["exp"]:
+        return _JWT_CACHE["token"]
+
     app_id = _get_env("GH_APP_ID")
     private_key = _get_env("GH_APP_PRIVATE_KEY")
 
@@ -24,27 +69,159 @@ def _github_app_jwt() -> str:
         "iss": app_id,
     }
     token = jwt.encode(payload, private_key, algorithm="RS256")
-    return token.decode("utf-8") if isinstance(token, bytes) else token
+    token = token.decode("utf-8") if isinstance(token, bytes) else token
+
+    _JWT_CACHE["token"] = token
+    _JWT_CACHE["exp"] = now + JWT_TTL_S
+    return token
+
+
+def _rate_limit_wait(r: requests.Response) -> float:
+    """Seconds to wait before the next request, based on GitHub's rate-limit headers."""
+    retry_after = r.headers.get("Retry-After")
+    if r.status_code in (403, 429) and retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+
+    remaining = r.headers.get("X-RateLimit-Remaining")
+    reset = r.headers.get("X-RateLimit-Reset")
+    if remaining is None or reset is None:
+        return 0.0
+    try:
+        if int(remaining) >= MIN_RATE_BUDGET:
+            return 0.0
+        return max(0.0, int(reset) - time.time() + 1)
+    except ValueError:
+        return 0.0
+
+
+class GHLimiter:
+    """
+    Token bucket shared by every thread talking to one GitHub rate-limit
+    bucket. acquire() blocks until a token is free and any header-imposed
+    pause (Retry-After / exhausted X-RateLimit-Remaining) has passed;
+    update() reads those headers from each response.
+    """
+
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.deadline = 0.0  # wall clock; X-RateLimit-Reset is epoch seconds
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                wait = self.deadline - time.time()
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def update(self, r: requests.Response) -> float:
+        """Pause the bucket if the response asks for it; returns the pause in seconds."""
+        wait = _rate_limit_wait(r)
+        if wait > 0:
+            with self._lock:
+                self.deadline = max(self.deadline, time.time() + wait)
+        return wait
+
+
+# Core REST/GraphQL budget is 5000/hour; search is metered separately at
+# 30/minute.
+_CORE_LIMITER = GHLimiter(per_minute=5000 / 60, burst=100)
+_SEARCH_LIMITER = GHLimiter(per_minute=30, burst=30)
+
+
+def gh_json(r: requests.Response):
+    """Parse a GitHub JSON response body (orjson when available)."""
+    return _json_loads(r.content) if r.content else None
+
+
+def gh_request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Issue a GitHub API request on the shared session, throttled by the shared
+    limiter for its bucket (search or core). A 403/429 with Retry-After (or an
+    exhausted budget) pauses the bucket and retries once. A 401 drops the
+    cached installation token and retries once with a fresh one.
+
+    A json= body is serialized with orjson when available.
+    """
+    kwargs["headers"] = {**GITHUB_HEADERS, **(kwargs.get("headers") or {})}
+    if "json" in kwargs:
+        kwargs["data"] = _json_dumps(kwargs.pop("json"))
+        kwargs["headers"]["Content-Type"] = "application/json"
+
+    limiter = _SEARCH_LIMITER if "/search/" in url else _CORE_LIMITER
+
+    limiter.acquire()
+    r = get_session().request(method, url, **kwargs)
+
+    if r.status_code == 401 and "Authorization" in kwargs["headers"]:
+        # Token revoked or expired ahead of expires_at: mint a new one.
+        _invalidate_installation_token()
+        kwargs["headers"] = {**kwargs["headers"], **gh_headers()}
+        limiter.acquire()
+        r = get_session().request(method, url, **kwargs)
+
+    wait = limiter.update(r)
+
+    if r.status_code in (403, 429) and wait > 0:
+        print(f"[GitHub] Rate limited ({r.status_code}); retrying in {wait:.0f}s")
+        limiter.acquire()
+        r = get_session().request(method, url, **kwargs)
+        wait = limiter.update(r)
+
+    if wait > 0 and r.status_code not in (403, 429):
+        print(f"[GitHub] Rate budget low; pausing GitHub calls for {wait:.0f}s")
+    return r
+
+
+def _parse_expires_at(value: str) -> float:
+    # GitHub returns ISO8601 with a trailing "Z", e.g. "2024-01-01T12:00:00Z".
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _invalidate_installation_token() -> None:
+    with _TOKEN_LOCK:
+        _TOKEN_CACHE["token"] = None
+        _TOKEN_CACHE["exp"] = 0.0
 
 
 def github_app_get_installation_token() -> str:
-    installation_id = _get_env("GH_INSTALLATION_ID")
-    app_jwt = _github_app_jwt()
+    with _TOKEN_LOCK:
+        if _TOKEN_CACHE["token"] and time.time() < _TOKEN_CACHE["exp"]:
+            return _TOKEN_CACHE["token"]
 
-    url = f"{GITHUB_API}/app/installations/{installation_id}/access_tokens"
-    headers = {
-        "Authorization": f"Bearer {app_jwt}",
-        "Accept": "application/vnd.github+json",
-    }
-    r = requests.post(url, headers=headers, timeout=20)
-    if r.status_code not in (200, 201):
-        raise RuntimeError(f"Install token error: {r.status_code} {r.text}")
-    return r.json()["token"]
+        installation_id = _get_env("GH_INSTALLATION_ID")
+        app_jwt = _github_app_jwt()
+
+        url = f"{GITHUB_API}/app/installations/{installation_id}/access_tokens"
+        headers = {**GITHUB_HEADERS, "Authorization": f"Bearer {app_jwt}"}
+        r = get_session().post(url, headers=headers, timeout=20)
+        if r.status_code not in (200, 201):
+            raise RuntimeError(f"Install token error: {r.status_code} {r.text}")
+
+        data = gh_json(r)
+        try:
+            exp = _parse_expires_at(data["expires_at"])
+        except (KeyError, TypeError, ValueError):
+            exp = time.time() + 60 * 60
+
+        _TOKEN_CACHE["token"] = data["token"]
+        _TOKEN_CACHE["exp"] = exp - TOKEN_EXPIRY_MARGIN_S
+        return _TOKEN_CACHE["token"]
 
 
 def gh_headers():
     token = github_app_get_installation_token()
-    return {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json",
-    }
\ No newline at end of file
+    return {"Authorization": f"Bearer {token}"}
\ No newline at end of file
@@ -1,10 +1,22 @@
 from __future__ import annotations
 
+import re
+
 from models.code_agent import message_code_agent
 from models.reason_agent import message_reasoning_agent
 
 from langchain.tools import tool
 
+CODE_SIGNALS = [
+    "write code", "implement", "refactor", "function", "class", "bug", "traceback",
+    "error:", "stack trace", "python", "typescript", "javascript", "langchain",
+    "langgraph", "pydantic", "file:", ".py", ".ts", ".js", "diff", "patch",
+    "drop-in", "module", "import", "pip", "venv",
+]
+
+# One case-insensitive pass over the message instead of a substring scan per signal.
+_CODE_RE = re.compile("|".join(re.escape(s) for s in CODE_SIGNALS), re.IGNORECASE)
+
 class AgentRouter:
     """
     Simple router:
@@ -17,16 +29,7 @@ class AgentRouter:
     
     def message(self, agent_msg: str) -> str:
         print("[Tools] Messaging Router")
-        text = (agent_msg or "").lower()
-
-        code_signals = [
-            "write code", "implement", "refactor", "function", "class", "bug", "traceback",
-            "error:", "stack trace", "python", "typescript", "javascript", "langchain",
-            "langgraph", "pydantic", "file:", ".py", ".ts", ".js", "diff", "patch",
-            "drop-in", "module", "import", "pip", "venv",
-        ]
-
-        wants_code = any(s in text for s in code_signals)
+        wants_code = bool(_CODE_RE.search(agent_msg or ""))
         if wants_code:
             print("[Tools] Using Coding Agent")
             return message_code_agent.run(agent_msg)
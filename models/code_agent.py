@@ -1,14 +1,22 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
 from openai import OpenAI
 from langchain_core.tools import tool
 
 
+@lru_cache(maxsize=1)
+def _client() -> OpenAI:
+    # Built lazily (env is loaded by the entrypoint after import) and reused so
+    # the underlying httpx pool keeps the TLS connection to api.openai.com alive.
+    return OpenAI()
+
+
 @tool("message_code_agent")
 def message_code_agent(agent_msg: str) -> str:
     """Write or modify code. Input: plain English request. Output: code-focused answer."""
-    client = OpenAI()
-    resp = client.responses.create(
+    resp = _client().responses.create(
         model="gpt-5-codex",
         input=agent_msg,
     )
@@ -1,27 +1,133 @@
+import asyncio
 import os
 import time
 import uuid
+from functools import lru_cache
 from typing import Optional
 
 from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 from langchain.agents import create_agent
+from langchain.agents.middleware import AgentMiddleware
 from langchain_openai import ChatOpenAI
 from langchain.tools import tool
 from langgraph.checkpoint.memory import InMemorySaver
 
 from models.agent_router import AgentRouter
-from tools.fs_tools import shell_run_tool, fs_read, fs_write, fs_list_dir, fs_exists, fs_delete
+from models.reason_agent import message_reasoning_agent_batch
+from tools.fs_tools import shell_run_tool, fs_read, fs_read_many, fs_write, fs_list_dir, fs_exists, fs_delete
 from tools.github_tools import (
     github_list_tree,
+    github_list_tree_recursive,
     github_read_text_file,
+    github_read_many,
     github_search_code,
+    github_search_many,
     github_propose_change,
+    github_propose_changes,
     github_create_branch,
     github_create_pull_request,
 )
-from tools.memory_tools import memory_load, memory_save
+from tools.memory_tools import memory_load, memory_save, memory_append
 from tools.notify_tools import telegram_send, telegram_get_response
-from tools.repo_tools import repo_verify
+from tools.repo_tools import repo_prefetch, repo_verify
+
+
+HEDGE_DELAY_S = 8.0
+SYSTEM_PROMPT_PATH = "system_prompt.txt"
+
+
+@lru_cache(maxsize=1)
+def _read_prompt(path: str, mtime_ns: int) -> str:
+    # mtime is part of the key, so an edited file is re-read automatically.
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class HedgedModelMiddleware(AgentMiddleware):
+    """
+    Hedge slow model calls: if the active model has not answered within
+    delay_s (or fails with a failover-worthy error), race the next model in
+    the failover order and keep whichever answers first.
+
+    Only the LLM call is hedged; tool execution happens outside this hook,
+    so side effects (Telegram, PRs) never run twice.
+
+    A hedge is a second concurrent request, which is billed on paid models,
+    so models marked "hedge": False (the OpenAI fallback) are never raced;
+    they are still reached through the normal sequential failover. The delay can be tuned with HEDGE_DELAY_S.
+    """
+
+    def __init__(self, owner: "MainAgent", delay_s: float = HEDGE_DELAY_S):
+        super().__init__()
+        self.owner = owner
+        self.delay_s = delay_s
+
+    def wrap_model_call(self, request, handler):
+        # Sync invocations keep plain sequential behaviour.
+        return handler(request)
+
+    async def awrap_model_call(self, request, handler):
+        owner = self.owner
+        n = len(owner.models)
+        backups = [
+            i for i in ((owner.model_idx + k) % n for k in range(1, n))
+            if owner.models[i].get("hedge", True)
+        ]
+
+        pending = {asyncio.create_task(handler(request))}
+        last_err: Optional[Exception] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=self.delay_s if backups else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        if not owner._should_failover(e):
+                            raise
+                        last_err = e
+                        continue
+                    if self._has_output(response):
+                        return response
+                    last_err = RuntimeError("empty assistant text")
+
+                # Hedge on timeout, or immediately if every in-flight call failed.
+                if backups and (not done or not pending):
+                    pending.add(asyncio.create_task(handler(self._hedge_request(request, backups.pop(0)))))
+
+            raise last_err if last_err else RuntimeError("All hedged models failed")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _hedge_request(self, request, idx: int):
+        owner = self.owner
+        spec = owner.models[idx]
+        if owner.debug:
+            print(f"[chat] hedge -> idx={idx} model={spec['model']} provider={spec.get('provider')}")
+        messages = list(request.messages)
+        if spec.get("provider") == "openai":
+            # The primary call still holds these messages; normalize copies.
+            messages = [
+                m.model_copy(deep=True) if isinstance(m, (AIMessage, ToolMessage)) else m
+                for m in messages
+            ]
+            messages = owner._normalize_tool_ids(messages)
+        return request.override(model=owner.llms[idx], messages=messages)
+
+    @staticmethod
+    def _has_output(response) -> bool:
+        msgs = getattr(response, "result", None) or [response]
+        for m in msgs:
+            if isinstance(m, AIMessage):
+                content = getattr(m, "content", "")
+                if getattr(m, "tool_calls", None) or (isinstance(content, str) and content.strip()):
+                    return True
+        return False
 
 
 class MainAgent:
@@ -38,7 +144,8 @@ class MainAgent:
             {"provider": "openrouter", "model": "z-ai/glm-4.5-air:free"},
             {"provider": "openrouter", "model": "openai/gpt-oss-20b:free"},
             {"provider": "openrouter", "model": "openai/gpt-oss-120b:free"},
-            {"provider": "openai", "model": "gpt-5-mini"},
+            # Paid: failover only, never raced as a hedge.
+            {"provider": "openai", "model": "gpt-5-mini", "hedge": False},
         ]
         self.model_idx = 0
 
@@ -82,43 +189,48 @@ class MainAgent:
         # Tools
         self.tools = [
             call_agent_router,
+            message_reasoning_agent_batch,
             shell_run_tool,
             fs_read,
+            fs_read_many,
             fs_write,
             fs_list_dir,
             fs_exists,
             fs_delete,
             github_list_tree,
+            github_list_tree_recursive,
             github_read_text_file,
+            github_read_many,
             github_search_code,
+            github_search_many,
             github_propose_change,
+            github_propose_changes,
             github_create_branch,
             create_pr,            # wrapped
             memory_load,
             memory_save,
+            memory_append,
             notify_user,          # wrapped
             telegram_get_response,
             report_no_changes,    # new
             repo_verify,
+            repo_prefetch,
         ]
 
         # Agent
         self.checkpointer = InMemorySaver()
-        self.model = self._make_llm(self.models[self.model_idx])
-        self.agent = create_agent(
-            model=self.model,
-            tools=self.tools,
-            checkpointer=self.checkpointer,
-            system_prompt=self.system_msg,
+        self.hedger = HedgedModelMiddleware(
+            self, delay_s=float(os.getenv("HEDGE_DELAY_S", HEDGE_DELAY_S))
         )
+        self.llms = [self._make_llm(spec) for spec in self.models]
+        self._build_agents()
 
     # --------------------
     # Setup
     # --------------------
 
     def _load_system_prompt(self) -> str:
-        with open("system_prompt.txt", "r", encoding="utf-8") as f:
-            return f.read()
+        return _read_prompt(SYSTEM_PROMPT_PATH, os.stat(SYSTEM_PROMPT_PATH).st_mtime_ns)
 
     def _make_llm(self, spec: dict) -> ChatOpenAI:
         model_name = spec["model"]
@@ -145,14 +257,24 @@ class MainAgent:
             max_retries=0,
         )
 
+    def _build_agents(self) -> None:
+        # One compiled agent per model, so failover is a pointer swap rather
+        # than a fresh create_agent (tool schemas, prompt, graph compile).
+        self.agents = [
+            create_agent(
+                model=llm,
+                tools=self.tools,
+                checkpointer=self.checkpointer,
+                system_prompt=self.system_msg,
+                middleware=[self.hedger],
+            )
+            for llm in self.llms
+        ]
+        self._rebuild_agent()
+
     def _rebuild_agent(self) -> None:
-        self.model = self._make_llm(self.models[self.model_idx])
-        self.agent = create_agent(
-            model=self.model,
-            tools=self.tools,
-            checkpointer=self.checkpointer,
-            system_prompt=self.system_msg,
-        )
+        self.model = self.llms[self.model_idx]
+        self.agent = self.agents[self.model_idx]
 
     def _failover(self) -> None:
         self.model_idx = (self.model_idx + 1) % len(self.models)
@@ -194,13 +316,16 @@ class MainAgent:
     # --------------------
 
     def message(self, user_msg: str, thread_id: int = 0) -> str:
+        return asyncio.run(self._message_async(user_msg, thread_id=thread_id))
+
+    async def _message_async(self, user_msg: str, thread_id: int = 0) -> str:
         if self.debug:
             print(f"[chat] recv thread={thread_id}")
 
         if user_msg.strip().lower() in {"reload system", "reload_system", "/reload_system", "/reload"}:
             try:
                 self.system_msg = self._load_system_prompt()
-                self._rebuild_agent()
+                self._build_agents()
                 return "System prompt reloaded."
             except Exception as e:
                 return f"System prompt reload failed: {type(e).__name__}: {e}"
@@ -246,7 +371,7 @@ class MainAgent:
                             ]
                         }
 
-                    result = self.agent.invoke(
+                    result = await self.agent.ainvoke(
                         input_payload,
                         {"configurable": {"thread_id": thread_id}},
                     )
@@ -280,7 +405,7 @@ class MainAgent:
 
                 if self._should_failover(e):
                     self._failover()
-                    time.sleep(0.4)
+                    await asyncio.sleep(0.4)
                     continue
 
                 raise
@@ -291,11 +416,15 @@ class MainAgent:
         msgs = result.get("messages") if isinstance(result, dict) else None
         if not msgs:
             return ""
+        # The checkpointed history grows every turn; only scan back to the
+        # latest human message (the final AIMessage is usually msgs[-1]).
         for m in reversed(msgs):
             if isinstance(m, AIMessage):
-                content = getattr(m, "content", "")
+                content = m.content
                 if isinstance(content, str) and content.strip():
                     return content.strip()
+            elif isinstance(m, HumanMessage):
+                break
         return ""
 
     def _should_failover(self, e: Exception) -> bool:
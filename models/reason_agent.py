@@ -1,15 +1,58 @@
 from __future__ import annotations
 
-from openai import OpenAI
+import asyncio
+from functools import lru_cache
+from typing import List
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
 from langchain_core.tools import tool
 
+REASONING_MODEL = "gpt-5"
+MAX_CONCURRENT_REQUESTS = 8
+
+
+@lru_cache(maxsize=1)
+def _client() -> OpenAI:
+    # Built lazily (env is loaded by the entrypoint after import) and reused so
+    # the keep-alive pool to api.openai.com survives across calls.
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        timeout=httpx.Timeout(600.0, connect=5.0),
+    )
+    return OpenAI(http_client=http_client)
+
 
 @tool("message_reasoning_agent")
 def message_reasoning_agent(agent_msg: str) -> str:
     """Reason, plan, or debug conceptually. Input: request. Output: concise reasoning/planning."""
-    client = OpenAI()
-    resp = client.responses.create(
-        model="gpt-5",
+    resp = _client().responses.create(
+        model=REASONING_MODEL,
         input=agent_msg,
     )
-    return resp.output_text or ""
\ No newline at end of file
+    return resp.output_text or ""
+
+
+async def _message_many(agent_msgs: List[str]) -> List[str]:
+    # The async client is tied to the event loop, so it lives for one batch.
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    limits = httpx.Limits(max_connections=MAX_CONCURRENT_REQUESTS, max_keepalive_connections=MAX_CONCURRENT_REQUESTS)
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(600.0, connect=5.0)) as http_client:
+        client = AsyncOpenAI(http_client=http_client)
+
+        async def _run(msg: str) -> str:
+            async with sem:
+                resp = await client.responses.create(model=REASONING_MODEL, input=msg)
+                return resp.output_text or ""
+
+        results = await asyncio.gather(*(_run(m) for m in agent_msgs), return_exceptions=True)
+
+    return [r if isinstance(r, str) else f"error: {type(r).__name__}: {r}" for r in results]
+
+
+@tool("message_reasoning_agent_batch")
+def message_reasoning_agent_batch(agent_msgs: List[str]) -> List[str]:
+    """Run several independent reasoning requests concurrently. Input: list of requests. Output: list of answers (same order)."""
+    if not agent_msgs:
+        return []
+    return asyncio.run(_message_many(agent_msgs))
\ No newline at end of file
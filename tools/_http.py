@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# One session for every outbound HTTP call (GitHub and Telegram), so both
+# hosts share a single pool manager and TLS context. Host-specific settings
+# live on per-host adapters; host-specific headers are added per request.
+SYNC_SESSION = requests.Session()
+SYNC_SESSION.headers.update({"User-Agent": "portfolio-agent"})
+SYNC_SESSION.mount("https://api.github.com", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=["GET", "POST", "PUT"],
+    ),
+))
+SYNC_SESSION.mount("https://api.telegram.org", HTTPAdapter(pool_connections=1, pool_maxsize=4))
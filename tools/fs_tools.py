@@ -1,7 +1,11 @@
 from __future__ import annotations
 import os
 import subprocess
-from typing import Any, Dict, List, Optional, Union
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 import time
 
@@ -10,86 +14,165 @@ from langchain.tools import tool
 
 MAX_OUTPUT_CHARS = 12_000          # cap to keep tokens low
 DEFAULT_TIMEOUT_S = 120
+READ_MANY_WORKERS = 8
+EXISTS_CACHE_TTL_S = 1.0
 ALLOWED_CWD_ROOT = os.path.abspath(".")  # restrict to agent workspace
+_O_BINARY = getattr(os, "O_BINARY", 0)     # Windows: no CRLF translation at the fd level
 
+# abs path -> (checked_at, exists). The agent probes the same paths repeatedly;
+# fs_write/fs_delete invalidate their own path, the TTL covers everything else.
+_exists_cache: Dict[str, Tuple[float, bool]] = {}
 
-@tool
-def shell_run_tool(cmd: Union[str, List[str]], cwd: Optional[str] = None, timeout_s: int = 120) -> Dict[str, Any]:
+
+def _read_file_bytes(abs_path: str, size: int) -> bytearray:
+    """Read up to `size` bytes with raw fd reads into one preallocated buffer."""
+    fd = os.open(abs_path, os.O_RDONLY | _O_BINARY)
+    try:
+        buf = bytearray(size)
+        view = memoryview(buf)
+        n = 0
+        while n < size:
+            if hasattr(os, "readv"):
+                got = os.readv(fd, [view[n:]])
+            else:
+                chunk = os.read(fd, size - n)
+                got = len(chunk)
+                view[n:n + got] = chunk
+            if got == 0:  # file shrank underneath us
+                break
+            n += got
+        view.release()
+        del buf[n:]
+        return buf
+    finally:
+        os.close(fd)
+
+
+def fs_exists_cache_invalidate(path_string: str) -> None:
+    """Drop any cached fs_exists answer for path_string."""
+    _exists_cache.pop(os.path.abspath(path_string), None)
+
+
+def _write_file_bytes(abs_path: str, data: bytes, append: bool = False) -> None:
+    """Write all of `data` with raw fd writes (no intermediate buffered writer)."""
+    flags = os.O_WRONLY | os.O_CREAT | _O_BINARY | (os.O_APPEND if append else os.O_TRUNC)
+    fd = os.open(abs_path, flags, 0o644)
+    try:
+        view = memoryview(data)
+        n = 0
+        while n < len(view):
+            n += os.write(fd, view[n:])
+    finally:
+        os.close(fd)
+
+
+def _pump(pipe, tail: Deque[str], seen: List[int], limit: int) -> None:
     """
-    Run a shell command safely and return structured output.
-    Never raises FileNotFoundError (WinError 2); returns ok=False instead.
+    Drain a text pipe to EOF, keeping only the last ~`limit` chars (where
+    errors usually are) as a deque of chunks; older chunks are dropped as
+    soon as the remainder still covers the limit.
     """
+    kept = 0
     try:
-        # If cmd is a string, use shell=True so Windows can resolve built-ins and spaced commands.
-        use_shell = isinstance(cmd, str)
+        for chunk in iter(lambda: pipe.read(4096), ""):
+            tail.append(chunk)
+            kept += len(chunk)
+            seen[0] += len(chunk)
+            while kept - len(tail[0]) >= limit:
+                kept -= len(tail.popleft())
+    finally:
+        pipe.close()
 
-        completed = subprocess.run(
-            cmd,
-            cwd=cwd,
-            timeout=timeout_s,
-            capture_output=True,
-            text=True,
-            shell=use_shell,
-        )
 
-        return {
-            "ok": completed.returncode == 0,
-            "returncode": completed.returncode,
-            "stdout": completed.stdout,
-            "stderr": completed.stderr,
-            "cmd": cmd,
-            "cwd": cwd,
-            "shell": use_shell,
-        }
+def _run_capped(
+    cmd: Union[str, List[str]],
+    cwd: Optional[str],
+    timeout_s: int,
+    use_shell: bool,
+    limit: int = MAX_OUTPUT_CHARS,
+    env: Optional[Dict[str, str]] = None,
+) -> Tuple[int, str, str]:
+    """
+    Run cmd while reader threads drain stdout/stderr into bounded tail
+    buffers, so memory stays O(limit) however much the command prints. The process is
+    never killed for being chatty, only on timeout.
 
-    except FileNotFoundError as e:
-        # This is your WinError 2 case: executable not found.
-        return {
-            "ok": False,
-            "error": f"FileNotFoundError: {e}",
-            "cmd": cmd,
-            "cwd": cwd,
-            "hint": "Executable not found on PATH. Agent likely called a unix tool (rg/grep/ls) or cmd was passed as a single string without shell.",
-        }
-    except subprocess.TimeoutExpired as e:
-        return {
-            "ok": False,
-            "error": f"TimeoutExpired: {e}",
-            "cmd": cmd,
-            "cwd": cwd,
-        }
-    except Exception as e:
-        return {
-            "ok": False,
-            "error": f"{type(e).__name__}: {e}",
-            "cmd": cmd,
-            "cwd": cwd,
-        }
+    Returns (returncode, stdout, stderr). Like subprocess.run, raises
+    subprocess.TimeoutExpired (after killing the process) on timeout.
+    """
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        shell=use_shell,
+        env={**os.environ, **env} if env else None,
+    )
+    out: Tuple[Deque[str], List[int]] = (deque(), [0])
+    err: Tuple[Deque[str], List[int]] = (deque(), [0])
+    readers = [
+        threading.Thread(target=_pump, args=(proc.stdout, *out, limit), daemon=True),
+        threading.Thread(target=_pump, args=(proc.stderr, *err, limit), daemon=True),
+    ]
+    for t in readers:
+        t.start()
+
+    try:
+        proc.wait(timeout=timeout_s)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        for t in readers:
+            t.join(timeout=5)
+
+    def _text(buf: Tuple[Deque[str], List[int]]) -> str:
+        tail, seen = buf
+        s = "".join(tail)
+        if seen[0] <= limit:
+            return s
+        return f"[truncated {seen[0] - limit} chars] ...\n" + s[-limit:]
+
+    return proc.returncode, _text(out), _text(err)
+
+
+@tool
+def shell_run_tool(cmd: Union[str, List[str]], cwd: Optional[str] = None, timeout_s: int = 120) -> Dict[str, Any]:
+    """
+    Run a shell command safely and return structured output.
+    Never raises FileNotFoundError (WinError 2); returns ok=False instead.
+    """
+    return shell_run(cmd, cwd=cwd, timeout_s=timeout_s, max_output_chars=MAX_OUTPUT_CHARS)
 
 # Non tool-reference verison
-def shell_run(cmd: Union[str, List[str]], cwd: Optional[str] = None, timeout_s: int = 120) -> Dict[str, Any]:
+def shell_run(
+    cmd: Union[str, List[str]],
+    cwd: Optional[str] = None,
+    timeout_s: int = 120,
+    max_output_chars: Optional[int] = None,
+    env: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
     """
     Run a shell command safely and return structured output.
     Never raises FileNotFoundError (WinError 2); returns ok=False instead.
+    max_output_chars caps stdout/stderr each (None keeps everything).
+    env adds/overrides variables on top of the current environment.
     """
     try:
         # If cmd is a string, use shell=True so Windows can resolve built-ins and spaced commands.
         use_shell = isinstance(cmd, str)
 
-        completed = subprocess.run(
-            cmd,
-            cwd=cwd,
-            timeout=timeout_s,
-            capture_output=True,
-            text=True,
-            shell=use_shell,
-        )
+        limit = sys.maxsize if max_output_chars is None else max_output_chars
+        returncode, stdout, stderr = _run_capped(cmd, cwd, timeout_s, use_shell, limit, env)
 
         return {
-            "ok": completed.returncode == 0,
-            "returncode": completed.returncode,
-            "stdout": completed.stdout,
-            "stderr": completed.stderr,
+            "ok": returncode == 0,
+            "returncode": returncode,
+            "stdout": stdout,
+            "stderr": stderr,
             "cmd": cmd,
             "cwd": cwd,
             "shell": use_shell,
@@ -119,7 +202,12 @@ def shell_run(cmd: Union[str, List[str]], cwd: Optional[str] = None, timeout_s:
             "cwd": cwd,
         }
 
-def fs_read(file_path: str, encoding: str = "utf-8", max_bytes: int = 2_000_000) -> Dict[str, Any]:
+def fs_read(
+    file_path: str,
+    encoding: str = "utf-8",
+    max_bytes: int = 2_000_000,
+    max_chars: int = MAX_OUTPUT_CHARS,
+) -> Dict[str, Any]:
     """
     Read a text file from the local repo workspace.
 
@@ -127,10 +215,11 @@ def fs_read(file_path: str, encoding: str = "utf-8", max_bytes: int = 2_000_000)
         file_path: Path relative to repo root (or absolute within repo root).
         encoding: Text encoding (default utf-8).
         max_bytes: Safety limit to avoid huge reads.
+        max_chars: Cap on returned characters (keeps tokens low); longer files are truncated.
 
     Returns:
         dict:
-          - on success: {"ok": True, "path": <input>, "abs_path": <abs>, "content": <str>}
+          - on success: {"ok": True, "path": <input>, "abs_path": <abs>, "content": <str>, "truncated": <bool>}
           - on error:   {"ok": False, "path": <input>, "error": <msg>}
     """
     if not file_path:
@@ -153,13 +242,49 @@ def fs_read(file_path: str, encoding: str = "utf-8", max_bytes: int = 2_000_000)
         return {"ok": False, "path": file_path, "error": f"File too large ({size} bytes) > max_bytes={max_bytes}"}
 
     try:
-        with open(abs_path, "r", encoding=encoding, errors="replace") as f:
-            content = f.read()
-        return {"ok": True, "path": file_path, "abs_path": abs_path, "content": content}
+        # No encoding needs more than 4 bytes per char, so never read past that.
+        to_read = min(size, max_chars * 4)
+        content = _read_file_bytes(abs_path, to_read).decode(encoding, errors="replace")
+        if "\r" in content:
+            # Match text-mode universal newlines.
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
+        truncated = to_read < size or len(content) > max_chars
+        if truncated:
+            content = content[:max_chars] + f"\n... [truncated, file is {size} bytes]"
+        return {"ok": True, "path": file_path, "abs_path": abs_path, "content": content, "truncated": truncated}
     except Exception as e:
         return {"ok": False, "path": file_path, "error": f"{type(e).__name__}: {e}"}
 
 
+def fs_read_many(
+    file_paths: List[str],
+    encoding: str = "utf-8",
+    max_bytes: int = 2_000_000,
+    max_chars: int = MAX_OUTPUT_CHARS,
+) -> Dict[str, Any]:
+    """
+    Read several text files from the local repo workspace in one call.
+
+    Args:
+        file_paths: Paths relative to repo root (or absolute within repo root).
+        encoding: Text encoding (default utf-8).
+        max_bytes: Per-file safety limit.
+        max_chars: Per-file cap on returned characters.
+
+    Returns:
+        dict: {"ok": True, "files": [<fs_read result>, ...]} (same order as file_paths)
+    """
+    if not file_paths:
+        return {"ok": False, "error": "Missing file_paths"}
+    if len(file_paths) == 1:
+        return {"ok": True, "files": [fs_read(file_paths[0], encoding, max_bytes, max_chars)]}
+
+    # Reads release the GIL, so a small pool overlaps their I/O latency.
+    with ThreadPoolExecutor(max_workers=min(READ_MANY_WORKERS, len(file_paths))) as pool:
+        files = list(pool.map(lambda p: fs_read(p, encoding, max_bytes, max_chars), file_paths))
+    return {"ok": True, "files": files}
+
+
 @tool
 def fs_write(path_string: str, mode: str, content: str) -> Optional[str]:
     """
@@ -171,31 +296,42 @@ def fs_write(path_string: str, mode: str, content: str) -> Optional[str]:
     Returns: None if success, otherwise str error message
     """
     try:
-        path = Path(path_string)
-        with open(file=path, mode=mode, encoding="utf-8") as file:
-            file.write(content)
+        if mode not in ("w", "a"):
+            return f"fs_write error: ValueError: mode must be 'w' or 'a', got {mode!r}"
+        if os.linesep != "\n":
+            # Match text-mode newline translation on Windows.
+            content = content.replace("\n", os.linesep)
+        _write_file_bytes(os.fspath(Path(path_string)), content.encode("utf-8"), append=(mode == "a"))
         return None
     except Exception as e:
         return f"fs_write error: {type(e).__name__}: {e}"
+    finally:
+        fs_exists_cache_invalidate(path_string)
 
 
 @tool
-def fs_list_dir(path_string: str) -> str:
+def fs_list_dir(path_string: str, prefix: str = "", limit: int = 0) -> str:
     """
     List directory contents.
     Args:
         path_string: str (directory to list)
+        prefix: str (optional, only entries whose name starts with this)
+        limit: int (optional, max entries to return; 0 = no limit)
     Returns:
         str: newline-separated entries or error message
     """
     try:
-        path = Path(path_string)
-        if not path.exists():
+        if not os.path.exists(path_string):
             return f"fs_list_dir error: FileNotFoundError: Path does not exist: {path_string}"
-        if not path.is_dir():
+        if not os.path.isdir(path_string):
             return f"fs_list_dir error: NotADirectoryError: Path is not a directory: {path_string}"
 
-        entries = sorted([p.name for p in path.iterdir()])
+        # scandir yields names straight from the directory read, no Path per entry.
+        with os.scandir(path_string) as it:
+            entries = [e.name for e in it if e.name.startswith(prefix)]
+        entries.sort()
+        if limit > 0:
+            del entries[limit:]
         return "\n".join(entries)
     except Exception as e:
         return f"fs_list_dir error: {type(e).__name__}: {e}"
@@ -211,8 +347,15 @@ def fs_exists(path_string: str) -> str:
         str: "true" / "false" or error message
     """
     try:
-        path = Path(path_string)
-        return "true" if path.exists() else "false"
+        key = os.path.abspath(path_string)
+        now = time.monotonic()
+        cached = _exists_cache.get(key)
+        if cached is not None and now - cached[0] < EXISTS_CACHE_TTL_S:
+            exists = cached[1]
+        else:
+            exists = os.path.exists(key)
+            _exists_cache[key] = (now, exists)
+        return "true" if exists else "false"
     except Exception as e:
         return f"fs_exists error: {type(e).__name__}: {e}"
 
@@ -240,4 +383,6 @@ def fs_delete(path_string: str) -> Optional[str]:
 
         return None
     except Exception as e:
-        return f"fs_delete error: {type(e).__name__}: {e}"
\ No newline at end of file
+        return f"fs_delete error: {type(e).__name__}: {e}"
+    finally:
+        fs_exists_cache_invalidate(path_string)
\ No newline at end of file
@@ -1,11 +1,142 @@
-import requests
-import base64
-from github_app_auth import gh_headers, GITHUB_API
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from github_app_auth import gh_headers, gh_json, gh_request, GITHUB_API
 from langchain.tools import tool
 
+try:
+    # SIMD base64 (drop-in API); noticeably faster on large file payloads.
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+MAX_UPLOAD_WORKERS = 8  # keep fan-out modest to stay under secondary rate limits
+MAX_SEARCH_WORKERS = 4  # search is paced by its own 30/min limiter anyway
+SEARCH_MAX_ITEMS = 100
+
+# Fields kept per entry unless the caller asks for others. GitHub's own
+# entries carry several URLs (and, for search, a whole repository object)
+# that only bloat what the model has to read.
+TREE_FIELDS = ["name", "path", "sha", "type", "size"]
+SEARCH_FIELDS = ["name", "path", "sha", "html_url"]
+PUT_CONFLICT_RETRIES = 3
+ETAG_CACHE_MAX_ENTRIES = 1024
+
+
+# -----------------------------
+# Conditional GET cache
+# -----------------------------
+
+# (url, params, raw) -> (etag, body). A 304 reply costs no primary rate limit
+# and carries no body, so unchanged paths are served from here.
+_ETAG_CACHE: "OrderedDict[Tuple[str, Tuple, bool], Tuple[str, Any]]" = OrderedDict()
+_ETAG_LOCK = threading.Lock()
+
+
+def _etag_key(url: str, params: Optional[Dict[str, str]] = None, raw: bool = False) -> Tuple[str, Tuple, bool]:
+    return (url, tuple(sorted((params or {}).items())), raw)
+
+
+def _cache_get(key) -> Optional[Tuple[str, Any]]:
+    with _ETAG_LOCK:
+        cached = _ETAG_CACHE.get(key)
+        if cached is not None:
+            _ETAG_CACHE.move_to_end(key)
+        return cached
+
+
+def _cache_put(key, etag: str, data: Any) -> None:
+    with _ETAG_LOCK:
+        _ETAG_CACHE[key] = (etag, data)
+        _ETAG_CACHE.move_to_end(key)
+        while len(_ETAG_CACHE) > ETAG_CACHE_MAX_ENTRIES:
+            _ETAG_CACHE.popitem(last=False)
+
+
+def _cache_drop(key) -> None:
+    with _ETAG_LOCK:
+        _ETAG_CACHE.pop(key, None)
+
+
+def _cached_sha(url: str, branch: str) -> str:
+    """Blob SHA from an earlier read of this path, if one is cached."""
+    cached = _cache_get(_etag_key(url, {"ref": branch}))
+    data = cached[1] if cached else None
+    return data.get("sha", "") if isinstance(data, dict) else ""
+
+
+def _get_cached(
+    url: str,
+    params: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+    raw: bool = False,
+):
+    """
+    GET a GitHub resource with If-None-Match revalidation.
+
+    Returns (resp, data): data is the parsed body on 200, the cached body on
+    304, and None otherwise (callers inspect resp.status_code as before).
+    With raw=True the file bytes are requested directly (no JSON/base64
+    envelope) and data is the decoded text.
+    """
+    key = _etag_key(url, params, raw)
+    cached = _cache_get(key)
+
+    headers = gh_headers()
+    if raw:
+        headers["Accept"] = "application/vnd.github.raw"
+    if cached:
+        headers["If-None-Match"] = cached[0]
+
+    resp = gh_request("GET", url, headers=headers, params=params, timeout=timeout)
+
+    if resp.status_code == 304 and cached:
+        return resp, cached[1]
+
+    if resp.status_code != 200:
+        return resp, None
+
+    data = resp.content.decode("utf-8", errors="replace") if raw else gh_json(resp)
+    etag = resp.headers.get("ETag")
+    if etag:
+        _cache_put(key, etag, data)
+    return resp, data
+
+
+def _project(rows: List[Dict[str, Any]], fields: List[str]) -> List[Dict[str, Any]]:
+    return [{k: row[k] for k in fields if k in row} for row in rows]
+
+
+def _graphql(query: str, variables: Dict[str, Any], timeout: float = 30) -> Dict[str, Any]:
+    """POST a GraphQL query; returns the "data" object or raises RuntimeError."""
+    resp = gh_request(
+        "POST",
+        f"{GITHUB_API}/graphql",
+        headers=gh_headers(),
+        json={"query": query, "variables": variables},
+        timeout=timeout,
+    )
+    if resp.status_code != 200:
+        raise RuntimeError(f"HTTP {resp.status_code}: {resp.text}")
+    body = gh_json(resp) or {}
+    if body.get("errors"):
+        raise RuntimeError("; ".join(err.get("message", str(err)) for err in body["errors"]))
+    return body.get("data") or {}
+
 
 @tool
-def github_list_tree(owner: str, repo: str, path: str = "", branch: str = "main") -> dict:
+def github_list_tree(
+    owner: str,
+    repo: str,
+    path: str = "",
+    branch: str = "main",
+    path_prefix: str = "",
+    paths_only: bool = False,
+    fields: Optional[List[str]] = None,
+) -> dict:
     """
     List files in a repository path.
     Args:
@@ -13,21 +144,67 @@ def github_list_tree(owner: str, repo: str, path: str = "", branch: str = "main"
         repo: str
         path: str (optional, default="")
         branch: str (optional, default="main")
+        path_prefix: str (optional) only keep entries whose path starts with this
+        paths_only: bool (optional) return a list of paths instead of entries
+        fields: list[str] (optional) entry keys to keep (default name, path, sha, type, size)
     Returns:
         dict: {"ok": True, ...} or {"ok": False, "error": "..."}
     """
     print(f"[Tools] Listing GitHub Tree {owner, repo}")
     try:
         url = f"{GITHUB_API}/repos/{owner}/{repo}/contents/{path}"
-        resp = requests.get(url, headers=gh_headers(), params={"ref": branch})
+        resp, data = _get_cached(url, params={"ref": branch})
         resp.raise_for_status()
 
-        return {"ok": True, "data": resp.json()}
+        if isinstance(data, list):
+            entries = [e for e in data if e.get("path", "").startswith(path_prefix)]
+            data = [e.get("path") for e in entries] if paths_only else _project(entries, fields or TREE_FIELDS)
+
+        return {"ok": True, "data": data}
 
     except Exception as e:
         return {"ok": False, "error": f"github_list_tree error: {type(e).__name__}: {e}"}
 
 
+@tool
+def github_list_tree_recursive(
+    owner: str,
+    repo: str,
+    branch: str = "main",
+    path_prefix: str = "",
+    paths_only: bool = False,
+    fields: Optional[List[str]] = None,
+) -> dict:
+    """
+    List EVERY file in a repository in one request (recursive git tree).
+    Prefer this over walking directories with github_list_tree.
+    Args:
+        owner: str
+        repo: str
+        branch: str (optional, default="main")
+        path_prefix: str (optional) only keep entries whose path starts with this
+        paths_only: bool (optional) return a list of paths instead of entries
+        fields: list[str] (optional) entry keys to keep (default path, sha, type, size)
+    Returns:
+        dict: {"ok": True, "data": [{"path", "type", "sha", "size"}, ...], "truncated": bool}
+              or {"ok": False, "error": "..."}
+    """
+    print(f"[Tools] Listing GitHub Tree (recursive) {owner, repo}")
+    try:
+        # The trees endpoint accepts a branch name directly, so no branch lookup is needed.
+        url = f"{GITHUB_API}/repos/{owner}/{repo}/git/trees/{branch}"
+        resp, data = _get_cached(url, params={"recursive": "1"})
+        resp.raise_for_status()
+
+        entries = [e for e in data.get("tree", []) if e.get("path", "").startswith(path_prefix)]
+        items = [e.get("path") for e in entries] if paths_only else _project(entries, fields or TREE_FIELDS)
+
+        return {"ok": True, "data": items, "truncated": bool(data.get("truncated"))}
+
+    except Exception as e:
+        return {"ok": False, "error": f"github_list_tree_recursive error: {type(e).__name__}: {e}"}
+
+
 @tool
 def github_read_text_file(owner: str, repo: str, path: str, branch: str = "main") -> dict:
     """
@@ -43,10 +220,15 @@ def github_read_text_file(owner: str, repo: str, path: str, branch: str = "main"
     print(f"[Tools] Reading GitHub Text File {owner, repo, path}")
     try:
         url = f"{GITHUB_API}/repos/{owner}/{repo}/contents/{path}"
-        resp = requests.get(url, headers=gh_headers(), params={"ref": branch})
+        resp, data = _get_cached(url, params={"ref": branch}, raw=True)
+        if resp.status_code not in (406, 415):
+            resp.raise_for_status()
+            return {"ok": True, "content": data}
+
+        # Raw media type not accepted: fall back to the JSON + base64 envelope.
+        resp, data = _get_cached(url, params={"ref": branch})
         resp.raise_for_status()
 
-        data = resp.json()
         if data.get("encoding") == "base64":
             content = base64.b64decode(data["content"]).decode("utf-8")
         else:
@@ -59,7 +241,69 @@ def github_read_text_file(owner: str, repo: str, path: str, branch: str = "main"
 
 
 @tool
-def github_search_code(query: str, owner: str = "", repo: str = "") -> dict:
+def github_read_many(owner: str, repo: str, paths: List[str], branch: str = "main") -> dict:
+    """
+    List the repository root and read several text files in ONE request (GraphQL).
+    Prefer this over repeated github_list_tree / github_read_text_file calls.
+    Args:
+        owner: str
+        repo: str
+        paths: list[str] (file paths to read, e.g. ["README.md", "_config.yml"])
+        branch: str (optional, default="main")
+    Returns:
+        dict:
+          - success: {"ok": True,
+                      "tree": [{"name", "path", "type", "sha"}, ...],
+                      "files": {<path>: {"ok": True, "content": str, "sha": str}
+                                        | {"ok": False, "error": str}}}
+          - failure: {"ok": False, "error": "<error message>"}
+    """
+    print(f"[Tools] Reading Many GitHub Files {owner, repo, paths}")
+    try:
+        var_defs = ["$owner: String!", "$repo: String!", "$root: String!"]
+        variables: Dict[str, Any] = {"owner": owner, "repo": repo, "root": f"{branch}:"}
+        fields = ["root: object(expression: $root) { ... on Tree { entries { name path type oid } } }"]
+        for i, p in enumerate(paths):
+            var_defs.append(f"$e{i}: String!")
+            variables[f"e{i}"] = f"{branch}:{p}"
+            fields.append(f"f{i}: object(expression: $e{i}) {{ ... on Blob {{ text oid isBinary }} }}")
+
+        query = (
+            f"query({', '.join(var_defs)}) {{ repository(owner: $owner, name: $repo) {{ "
+            + " ".join(fields)
+            + " } }"
+        )
+        data = _graphql(query, variables).get("repository") or {}
+
+        tree = [
+            {"name": e.get("name"), "path": e.get("path"), "type": e.get("type"), "sha": e.get("oid")}
+            for e in ((data.get("root") or {}).get("entries") or [])
+        ]
+
+        files: Dict[str, Dict[str, Any]] = {}
+        for i, p in enumerate(paths):
+            blob = data.get(f"f{i}")
+            if not blob:
+                files[p] = {"ok": False, "error": f"File not found: {p}"}
+            elif blob.get("isBinary") or blob.get("text") is None:
+                files[p] = {"ok": False, "error": f"Not a text file: {p}"}
+            else:
+                files[p] = {"ok": True, "content": blob["text"], "sha": blob.get("oid")}
+
+        return {"ok": True, "tree": tree, "files": files}
+
+    except Exception as e:
+        return {"ok": False, "error": f"github_read_many error: {type(e).__name__}: {e}"}
+
+
+@tool
+def github_search_code(
+    query: str,
+    owner: str = "",
+    repo: str = "",
+    fields: Optional[List[str]] = None,
+    max_items: int = SEARCH_MAX_ITEMS,
+) -> dict:
     """
     Search for code or text within a GitHub repository using the GitHub Code Search API.
 
@@ -76,6 +320,12 @@ def github_search_code(query: str, owner: str = "", repo: str = "") -> dict:
             Repository name (e.g., "tristan-allen-portfolio").  
             Must be provided together with owner to scope the search.
 
+        fields: list[str] (optional)
+            Keys kept per result item (default name, path, sha, html_url).
+
+        max_items: int (optional, default 100)
+            Stop paging once this many items have been collected.
+
     Behavior:
         - If both owner and repo are provided, the function automatically scopes
           the query to that repository.
@@ -87,7 +337,7 @@ def github_search_code(query: str, owner: str = "", repo: str = "") -> dict:
             On success:
                 {
                     "ok": True,
-                    "data": <full GitHub search API response>
+                    "data": {"total_count", "incomplete_results", "items": [...]}
                 }
 
             On failure:
@@ -105,17 +355,95 @@ def github_search_code(query: str, owner: str = "", repo: str = "") -> dict:
     """
     print(f"[Tools] Searching GitHub Code {query, owner, repo}")
     try:
-        if owner and repo:
-            query = f"{query} repo:{owner}/{repo}"
+        return {"ok": True, "data": _search_code(query, owner, repo, fields, max_items)}
+
+    except Exception as e:
+        return {"ok": False, "error": f"github_search_code error: {type(e).__name__}: {e}"}
+
 
-        url = f"{GITHUB_API}/search/code"
-        resp = requests.get(url, headers=gh_headers(), params={"q": query})
+def _search_code(
+    query: str,
+    owner: str = "",
+    repo: str = "",
+    fields: Optional[List[str]] = None,
+    max_items: int = SEARCH_MAX_ITEMS,
+) -> Dict[str, Any]:
+    if owner and repo:
+        query = f"{query} repo:{owner}/{repo}"
+
+    max_items = max(1, int(max_items))
+    url: Optional[str] = f"{GITHUB_API}/search/code"
+    params: Optional[Dict[str, str]] = {"q": query, "per_page": str(min(100, max_items))}
+    items: List[Dict[str, Any]] = []
+    total, incomplete = 0, False
+
+    # Follow Link: rel="next" only until max_items, so unread pages aren't fetched.
+    while url and len(items) < max_items:
+        resp = gh_request("GET", url, headers=gh_headers(), params=params)
         resp.raise_for_status()
+        page = gh_json(resp) or {}
+        total = page.get("total_count", total)
+        incomplete = incomplete or bool(page.get("incomplete_results"))
+        batch = page.get("items") or []
+        items.extend(batch)
+        url = resp.links.get("next", {}).get("url") if batch else None
+        params = None  # the next link already carries the query
 
-        return {"ok": True, "data": resp.json()}
+    return {
+        "total_count": total,
+        "incomplete_results": incomplete,
+        "items": _project(items[:max_items], fields or SEARCH_FIELDS),
+    }
+
+
+@tool
+def github_search_many(
+    queries: List[str],
+    owner: str = "",
+    repo: str = "",
+    fields: Optional[List[str]] = None,
+    max_items: int = SEARCH_MAX_ITEMS,
+) -> dict:
+    """
+    Run several code searches in one tool call (same syntax as github_search_code).
+
+    Duplicate queries are sent once, and the searches run concurrently under
+    the shared search rate limiter, so related lookups don't cost a model
+    round-trip each.
+
+    Args:
+        queries: list[str]
+            GitHub code search queries.
+        owner, repo: str (optional)
+            Scope every query to this repository.
+        fields, max_items: as in github_search_code.
+
+    Returns:
+        dict:
+            {
+                "ok": True,
+                "results": { "<query>": {"ok": True, "data": ...} | {"ok": False, "error": "..."} }
+            }
+    """
+    print(f"[Tools] Searching GitHub Code x{len(queries)} {owner, repo}")
+    try:
+        unique = list(dict.fromkeys(queries))
+        if not unique:
+            return {"ok": True, "results": {}}
+
+        def run(q: str) -> dict:
+            try:
+                return {"ok": True, "data": _search_code(q, owner, repo, fields, max_items)}
+            except Exception as e:
+                return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+        with ThreadPoolExecutor(max_workers=min(MAX_SEARCH_WORKERS, len(unique))) as pool:
+            results = dict(zip(unique, pool.map(run, unique)))
+
+        return {"ok": True, "results": results}
 
     except Exception as e:
-        return {"ok": False, "error": f"github_search_code error: {type(e).__name__}: {e}"}
+        return {"ok": False, "error": f"github_search_many error: {type(e).__name__}: {e}"}
 
 
 @tool
@@ -148,36 +476,345 @@ def github_propose_change(
     """
     print(f"[Tools] Proposing GitHub Change {owner, repo, message}")
     try:
-        url = f"{GITHUB_API}/repos/{owner}/{repo}/contents/{path}"
+        return _put_file(owner, repo, path, content, message, branch, sha)
+    except Exception as e:
+        return {"ok": False, "error": f"github_propose_change error: {type(e).__name__}: {e}"}
 
-        # If updating an existing file, GitHub requires the current blob SHA.
-        if not sha:
-            get_resp = requests.get(url, headers=gh_headers(), params={"ref": branch}, timeout=20)
-            if get_resp.status_code == 200:
-                sha = (get_resp.json() or {}).get("sha", "")
-            elif get_resp.status_code not in (404,):
-                # 404 means "file not found" -> create new file, no sha needed
-                return {"ok": False, "error": f"github_propose_change error: HTTP {get_resp.status_code}: {get_resp.text}"}
-
-        encoded_content = base64.b64encode(content.encode("utf-8")).decode("utf-8")
-
-        payload = {
-            "message": message,
-            "content": encoded_content,
-            "branch": branch,
-        }
-        if sha:
-            payload["sha"] = sha
 
-        put_resp = requests.put(url, headers=gh_headers(), json=payload, timeout=20)
-        if put_resp.status_code not in (200, 201):
-            return {"ok": False, "error": f"github_propose_change error: HTTP {put_resp.status_code}: {put_resp.text}"}
+def _put_file(
+    owner: str,
+    repo: str,
+    path: str,
+    content: str,
+    message: str,
+    branch: str,
+    sha: str = "",
+    err_prefix: str = "github_propose_change",
+) -> dict:
+    """Create or update one file via the Contents API (non tool-reference helper)."""
+    url = f"{GITHUB_API}/repos/{owner}/{repo}/contents/{path}"
+
+    # Updating an existing file needs its blob SHA. Reuse one from an earlier
+    # JSON read when we have it; otherwise look it up (404 = new file).
+    sha_from_cache = False
+    if not sha:
+        sha = _cached_sha(url, branch)
+        sha_from_cache = bool(sha)
+    if not sha:
+        sha, err = _lookup_sha(url, branch)
+        if err is not None:
+            return {"ok": False, "error": f"{err_prefix} error: HTTP {err.status_code}: {err.text}"}
+
+    encoded_content = base64.b64encode(content.encode("utf-8")).decode("utf-8")
+
+    payload = {
+        "message": message,
+        "content": encoded_content,
+        "branch": branch,
+    }
+    if sha:
+        payload["sha"] = sha
+
+    if sha_from_cache:
+        # A cached SHA may be stale; a 409/422 here most likely means the file
+        # changed since it was cached, which retrying the same payload won't
+        # fix. Look the current SHA up once and retry.
+        put_resp = gh_request("PUT", url, headers=gh_headers(), json=payload, timeout=20)
+        if put_resp.status_code in (409, 422):
+            _cache_drop(_etag_key(url, {"ref": branch}))
+            payload.pop("sha")
+            sha, err = _lookup_sha(url, branch)
+            if err is not None:
+                return {"ok": False, "error": f"{err_prefix} error: HTTP {err.status_code}: {err.text}"}
+            if sha:
+                payload["sha"] = sha
+            put_resp = _put_with_retry(url, payload)
+    else:
+        put_resp = _put_with_retry(url, payload)
+
+    if put_resp.status_code not in (200, 201):
+        return {"ok": False, "error": f"{err_prefix} error: HTTP {put_resp.status_code}: {put_resp.text}"}
+
+    # The cached read (and its SHA) is now stale.
+    _cache_drop(_etag_key(url, {"ref": branch}))
+
+    return {"ok": True, "data": gh_json(put_resp)}
+
+
+def _lookup_sha(url: str, branch: str):
+    # (sha, None) for an existing file, ("", None) for a missing one, and
+    # ("", resp) when the lookup itself failed.
+    get_resp, data = _get_cached(url, params={"ref": branch}, timeout=20)
+    if get_resp.status_code in (200, 304):
+        return (data or {}).get("sha", ""), None
+    if get_resp.status_code == 404:
+        return "", None
+    return "", get_resp
+
+
+def _put_with_retry(url: str, payload: Dict[str, Any]):
+    # Commits to the same branch are serialized by GitHub; concurrent writers
+    # see 409 when the branch head moves underneath them, so back off and retry.
+    for attempt in range(PUT_CONFLICT_RETRIES + 1):
+        put_resp = gh_request("PUT", url, headers=gh_headers(), json=payload, timeout=20)
+        if put_resp.status_code != 409 or attempt == PUT_CONFLICT_RETRIES:
+            break
+        time.sleep(0.5 * (2 ** attempt))
+    return put_resp
+
+
+def github_commit_tree(
+    owner: str,
+    repo: str,
+    branch: str,
+    changes: List[Dict[str, str]],
+    message: str,
+    head_sha: str = "",
+) -> dict:
+    """
+    Write several files to a branch as a single commit via the Git Data API
+    (blobs -> tree -> commit -> update ref). Non tool-reference helper.
+
+    Each blob is its own request, so this also handles changes too large for
+    a single createCommitOnBranch request body.
+
+    Args:
+        owner: str
+        repo: str
+        branch: str (existing branch to advance)
+        changes: list of {"path": str, "content": str}
+        message: str (commit message)
+        head_sha: str (optional parent; the branch only moves if it is
+            still there, since the ref update is not forced)
+
+    Returns:
+        dict:
+          - success: {"ok": True, "commit": <sha>, "files": [<path>, ...]}
+          - failure: {"ok": False, "error": "<error message>"}
+    """
+    try:
+        git_url = f"{GITHUB_API}/repos/{owner}/{repo}/git"
+
+        def _create_blob(change: Dict[str, str]) -> str:
+            encoded = base64.b64encode(change["content"].encode("utf-8")).decode("utf-8")
+            r = gh_request(
+                "POST",
+                f"{git_url}/blobs",
+                headers=gh_headers(),
+                json={"content": encoded, "encoding": "base64"},
+                timeout=20,
+            )
+            if r.status_code not in (200, 201):
+                raise RuntimeError(f"blob {change['path']}: HTTP {r.status_code}: {r.text}")
+            return gh_json(r)["sha"]
+
+        # 1) blobs (independent, so upload them concurrently)
+        with ThreadPoolExecutor(max_workers=min(MAX_UPLOAD_WORKERS, len(changes))) as pool:
+            blob_shas = list(pool.map(_create_blob, changes))
+
+        # 2) branch head commit + its tree
+        if not head_sha:
+            r = gh_request("GET", f"{git_url}/ref/heads/{branch}", headers=gh_headers(), timeout=20)
+            if r.status_code != 200:
+                return {"ok": False, "error": f"github_commit_tree error: HTTP {r.status_code}: {r.text}"}
+            head_sha = gh_json(r)["object"]["sha"]
+
+        r = gh_request("GET", f"{git_url}/commits/{head_sha}", headers=gh_headers(), timeout=20)
+        if r.status_code != 200:
+            return {"ok": False, "error": f"github_commit_tree error: HTTP {r.status_code}: {r.text}"}
+        base_tree = gh_json(r)["tree"]["sha"]
+
+        # 3) new tree on top of the current one
+        tree = [
+            {"path": c["path"], "mode": "100644", "type": "blob", "sha": blob_sha}
+            for c, blob_sha in zip(changes, blob_shas)
+        ]
+        r = gh_request(
+            "POST",
+            f"{git_url}/trees",
+            headers=gh_headers(),
+            json={"base_tree": base_tree, "tree": tree},
+            timeout=20,
+        )
+        if r.status_code not in (200, 201):
+            return {"ok": False, "error": f"github_commit_tree error: HTTP {r.status_code}: {r.text}"}
+        tree_sha = gh_json(r)["sha"]
+
+        # 4) commit
+        r = gh_request(
+            "POST",
+            f"{git_url}/commits",
+            headers=gh_headers(),
+            json={"message": message, "tree": tree_sha, "parents": [head_sha]},
+            timeout=20,
+        )
+        if r.status_code not in (200, 201):
+            return {"ok": False, "error": f"github_commit_tree error: HTTP {r.status_code}: {r.text}"}
+        commit_sha = gh_json(r)["sha"]
+
+        # 5) move the branch
+        r = gh_request(
+            "PATCH",
+            f"{git_url}/refs/heads/{branch}",
+            headers=gh_headers(),
+            json={"sha": commit_sha},
+            timeout=20,
+        )
+        if r.status_code != 200:
+            return {"ok": False, "error": f"github_commit_tree error: HTTP {r.status_code}: {r.text}"}
 
-        return {"ok": True, "data": put_resp.json()}
+        return {"ok": True, "commit": commit_sha, "files": [c["path"] for c in changes]}
 
     except Exception as e:
-        return {"ok": False, "error": f"github_propose_change error: {type(e).__name__}: {e}"}
-    
+        return {"ok": False, "error": f"github_commit_tree error: {type(e).__name__}: {e}"}
+
+
+def github_commit_on_branch(
+    owner: str,
+    repo: str,
+    branch: str,
+    changes: List[Dict[str, str]],
+    message: str,
+) -> dict:
+    """
+    Write several files to a branch as a single commit with the GraphQL
+    createCommitOnBranch mutation: one ref lookup plus one mutation, however
+    many files change. Non tool-reference helper.
+
+    Args: same as github_commit_tree.
+
+    Returns:
+        dict: as github_commit_tree. A failed mutation also carries
+        "expected_head" (the head it was built on) and "rejected": True when
+        GitHub definitely refused it (HTTP 4xx or a GraphQL errors payload).
+        Without "rejected" (timeouts, resets, 5xx) the commit may have landed.
+    """
+    head_sha = ""
+    try:
+        r = gh_request(
+            "GET",
+            f"{GITHUB_API}/repos/{owner}/{repo}/git/ref/heads/{branch}",
+            headers=gh_headers(),
+            timeout=20,
+        )
+        if r.status_code != 200:
+            return {"ok": False, "error": f"github_commit_on_branch error: HTTP {r.status_code}: {r.text}"}
+        head_sha = gh_json(r)["object"]["sha"]
+
+        headline, _, body = message.partition("\n")
+        commit_input = {
+            "branch": {"repositoryNameWithOwner": f"{owner}/{repo}", "branchName": branch},
+            "message": {"headline": headline, "body": body.strip()},
+            "expectedHeadOid": head_sha,
+            "fileChanges": {
+                "additions": [
+                    {
+                        "path": c["path"],
+                        "contents": base64.b64encode(c["content"].encode("utf-8")).decode("ascii"),
+                    }
+                    for c in changes
+                ]
+            },
+        }
+        # Not _graphql(): the status decides whether a fallback is safe.
+        resp = gh_request(
+            "POST",
+            f"{GITHUB_API}/graphql",
+            headers=gh_headers(),
+            json={
+                "query": "mutation($input: CreateCommitOnBranchInput!) {"
+                " createCommitOnBranch(input: $input) { commit { oid } } }",
+                "variables": {"input": commit_input},
+            },
+            timeout=30,
+        )
+        if resp.status_code != 200:
+            return {
+                "ok": False,
+                "error": f"github_commit_on_branch error: HTTP {resp.status_code}: {resp.text}",
+                "expected_head": head_sha,
+                "rejected": 400 <= resp.status_code < 500,
+            }
+        body = gh_json(resp) or {}
+        if body.get("errors"):
+            errors = "; ".join(err.get("message", str(err)) for err in body["errors"])
+            return {
+                "ok": False,
+                "error": f"github_commit_on_branch error: {errors}",
+                "expected_head": head_sha,
+                "rejected": True,
+            }
+        commit_sha = body["data"]["createCommitOnBranch"]["commit"]["oid"]
+
+        return {"ok": True, "commit": commit_sha, "files": [c["path"] for c in changes]}
+
+    except Exception as e:
+        result = {"ok": False, "error": f"github_commit_on_branch error: {type(e).__name__}: {e}"}
+        if head_sha:
+            result["expected_head"] = head_sha
+        return result
+
+
+def _branch_head(owner: str, repo: str, branch: str) -> str:
+    """Current head SHA of a branch, or "" if it can't be read."""
+    try:
+        r = gh_request(
+            "GET",
+            f"{GITHUB_API}/repos/{owner}/{repo}/git/ref/heads/{branch}",
+            headers=gh_headers(),
+            timeout=20,
+        )
+        return gh_json(r)["object"]["sha"] if r.status_code == 200 else ""
+    except Exception:
+        return ""
+
+
+@tool
+def github_propose_changes(
+    owner: str,
+    repo: str,
+    changes: List[Dict[str, str]],
+    message: str,
+    branch: str = "main",
+) -> dict:
+    """
+    Create or update several files in a GitHub repository as one commit.
+
+    Args:
+        owner: str
+        repo: str
+        changes: list of {"path": str, "content": str}
+        message: str (commit message)
+        branch: str (optional, default="main")
+
+    Returns:
+        dict:
+          - success: {"ok": True, "commit": <sha>, "files": [<path>, ...]}
+          - failure: {"ok": False, "error": "<error message>"}
+    """
+    print(f"[Tools] Proposing GitHub Changes {owner, repo, message}")
+    if not changes:
+        return {"ok": False, "error": "github_propose_changes error: 'changes' is required"}
+
+    result = github_commit_on_branch(owner, repo, branch, changes, message)
+    if not result["ok"] and result.get("rejected"):
+        # GitHub refused the mutation, so nothing was written (e.g. a request
+        # body over the GraphQL size limit). Retry via the Git Data API, but
+        # only on the same head: if the branch moved, the reason may be our
+        # own commit landing, and committing again would duplicate it.
+        head = _branch_head(owner, repo, branch)
+        if head != result["expected_head"]:
+            result["error"] += " (branch head moved; not retrying)"
+        else:
+            print(f"[Tools] createCommitOnBranch rejected, using Git Data API: {result['error']}")
+            result = github_commit_tree(owner, repo, branch, changes, message, head_sha=head)
+
+    if result["ok"]:
+        for c in changes:
+            _cache_drop(_etag_key(f"{GITHUB_API}/repos/{owner}/{repo}/contents/{c['path']}", {"ref": branch}))
+    return result
+
+
 @tool
 def github_create_branch(owner: str, repo: str, base_branch: str, new_branch: str) -> dict:
     """
@@ -195,15 +832,15 @@ def github_create_branch(owner: str, repo: str, base_branch: str, new_branch: st
     try:
         # 1) get base branch SHA
         ref_url = f"{GITHUB_API}/repos/{owner}/{repo}/git/ref/heads/{base_branch}"
-        r = requests.get(ref_url, headers=gh_headers(), timeout=20)
+        r = gh_request("GET", ref_url, headers=gh_headers(), timeout=20)
         if r.status_code != 200:
             return {"ok": False, "error": f"github_create_branch error: HTTP {r.status_code}: {r.text}"}
-        base_sha = (r.json() or {}).get("object", {}).get("sha")
+        base_sha = (gh_json(r) or {}).get("object", {}).get("sha")
 
         # 2) create new ref
         create_url = f"{GITHUB_API}/repos/{owner}/{repo}/git/refs"
         payload = {"ref": f"refs/heads/{new_branch}", "sha": base_sha}
-        c = requests.post(create_url, headers=gh_headers(), json=payload, timeout=20)
+        c = gh_request("POST", create_url, headers=gh_headers(), json=payload, timeout=20)
 
         if c.status_code not in (200, 201):
             # If already exists, treat as ok
@@ -242,10 +879,10 @@ def github_create_pull_request(
     try:
         url = f"{GITHUB_API}/repos/{owner}/{repo}/pulls"
         payload = {"title": title, "head": head_branch, "base": base_branch, "body": body}
-        r = requests.post(url, headers=gh_headers(), json=payload, timeout=20)
+        r = gh_request("POST", url, headers=gh_headers(), json=payload, timeout=20)
         if r.status_code not in (200, 201):
             return {"ok": False, "error": f"github_create_pull_request error: HTTP {r.status_code}: {r.text}"}
-        data = r.json()
+        data = gh_json(r)
         return {"ok": True, "number": data.get("number"), "url": data.get("html_url")}
     except Exception as e:
         return {"ok": False, "error": f"github_create_pull_request error: {type(e).__name__}: {e}"}
\ No newline at end of file
@@ -1,12 +1,123 @@
-import json
 import os
+from typing import Any, Dict, Tuple
 
 from langchain.tools import tool
 
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+    def _loads(data: bytes):
+        return orjson.loads(data)
+
+    def _dumps_line(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    import json
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode("utf-8")
+
+    def _loads(data: bytes):
+        return json.loads(data)
+
+    def _dumps_line(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+# Appended list items go to "<path>.jsonl" (one {"key", "item"} per line) so
+# growing runs[]/items[] doesn't mean rewriting the whole file; memory_load
+# folds them back in and compacts once the delta passes this size.
+MEMORY_COMPACT_BYTES = 256 * 1024
+
+# path -> ((snapshot (mtime_ns, size), delta (mtime_ns, size)), parsed data).
+# The agent loads memory many times per run; re-parse only when either file
+# changed on disk. Size catches appends that land within the mtime granularity.
+# Cached data is shared, so treat what memory_load returns as read-only.
+_CACHE: Dict[str, Tuple[Tuple[Tuple[int, int], Tuple[int, int]], Any]] = {}
+
+
+def _delta_path(path: str) -> str:
+    return path + ".jsonl"
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return (0, 0)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _atomic_write(path: str, payload: bytes) -> None:
+    # Write a sibling temp file and swap it in, so a crash mid-write never
+    # leaves a truncated memory file behind.
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _apply_delta(data: Any, delta_path: str) -> int:
+    """
+    Fold appended items into data; returns the delta file size (0 if none).
+    Entries that can't apply (malformed, or aimed at a non-list value) are
+    skipped, so a bad append can never make memory unloadable.
+    """
+    try:
+        with open(delta_path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return 0
+
+    if not isinstance(data, dict):
+        return len(raw)
+
+    for line in raw.splitlines():
+        try:
+            entry = _loads(line)
+        except ValueError:
+            continue  # torn last line from an interrupted append
+        if not isinstance(entry, dict) or not isinstance(entry.get("key"), str) or "item" not in entry:
+            continue
+        target = data.setdefault(entry["key"], [])
+        if isinstance(target, list):
+            target.append(entry["item"])
+    return len(raw)
+
+
+def _load_memory(path: str) -> Any:
+    delta_path = _delta_path(path)
+
+    if not os.path.exists(path):
+        base = {"version": 1, "runs": [], "items": []}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _atomic_write(path, _dumps(base))
+
+    stamp = (_stamp(path), _stamp(delta_path))
+    cached = _CACHE.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with open(path, "rb") as f:
+        data = _loads(f.read())
+
+    if _apply_delta(data, delta_path) > MEMORY_COMPACT_BYTES:
+        _atomic_write(path, _dumps(data))
+        os.remove(delta_path)
+        stamp = (_stamp(path), (0, 0))
+    _CACHE[path] = (stamp, data)
+    return data
+
+
 @tool
 def memory_load(path: str) -> dict:
     """
     Load memory JSON from disk. If it does not exist, create a default structure.
+    Items added with memory_append are merged in.
     Args:
         path: str
     Returns:
@@ -14,27 +125,17 @@ def memory_load(path: str) -> dict:
     """
     print("[Tools] Loading Memory . . .")
     try:
-        if not os.path.exists(path):
-            base = {"version": 1, "runs": [], "items": []}
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(base, f, indent=2)
-
-            return {"ok": True, "path": path, "data": base}
-
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        return {"ok": True, "path": path, "data": data}
+        return {"ok": True, "path": path, "data": _load_memory(path)}
 
     except Exception as e:
         return {"ok": False, "error": f"memory_load error: {type(e).__name__}: {e}"}
 
+
 @tool
 def memory_save(path: str, data: dict) -> dict:
     """
-    Save memory JSON to disk.
+    Save memory JSON to disk (atomically). The data replaces any items
+    previously added with memory_append.
     Args:
         path: str,
         data: dict
@@ -48,10 +149,47 @@ def memory_save(path: str, data: dict) -> dict:
 
         os.makedirs(os.path.dirname(path), exist_ok=True)
 
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        _atomic_write(path, _dumps(data))
+        try:
+            os.remove(_delta_path(path))
+        except FileNotFoundError:
+            pass
+        _CACHE.pop(path, None)
 
         return {"ok": True, "path": path, "saved": True}
 
     except Exception as e:
-        return {"ok": False, "error": f"memory_save error: {type(e).__name__}: {e}"}
\ No newline at end of file
+        return {"ok": False, "error": f"memory_save error: {type(e).__name__}: {e}"}
+
+
+@tool
+def memory_append(path: str, key: str, item: Any) -> dict:
+    """
+    Append one item to a list in memory (e.g. key="runs") without rewriting
+    the whole file. The item shows up in the next memory_load. Fails if
+    memory[key] exists and is not a list.
+    Args:
+        path: str
+        key: str
+        item: any JSON value
+    Returns:
+        dict: {"ok": True, ...} or {"ok": False, "error": "..."}
+    """
+    print(f"[Tools] Appending to Memory ({key}) . . .")
+    try:
+        if not path or not key:
+            return {"ok": False, "error": "memory_append error: ValueError: 'path' and 'key' are required"}
+
+        data = _load_memory(path)
+        if not isinstance(data, dict):
+            return {"ok": False, "error": "memory_append error: TypeError: memory is not a JSON object"}
+        if not isinstance(data.get(key, []), list):
+            return {"ok": False, "error": f"memory_append error: TypeError: '{key}' is not a list"}
+
+        with open(_delta_path(path), "ab") as f:
+            f.write(_dumps_line({"key": key, "item": item}) + b"\n")
+
+        return {"ok": True, "path": path, "key": key, "appended": True}
+
+    except Exception as e:
+        return {"ok": False, "error": f"memory_append error: {type(e).__name__}: {e}"}
\ No newline at end of file
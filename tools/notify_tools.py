@@ -4,6 +4,55 @@ import os
 import time 
 
 from langchain.tools import tool
+from tools._http import SYNC_SESSION
+
+try:
+    import orjson
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    import json
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+# Telegram holds a getUpdates long poll open for at most ~50s.
+TELEGRAM_LONG_POLL_MAX_S = 50
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Unix date of our last successful send, taken from the sendMessage result.
+# Replies to that message are no older than this, so telegram_get_response
+# skips anything dated before it instead of taking it for the answer.
+_LAST_SEND_DATE = None
+
+# (token, chat_id, base_url), resolved once. Not done at import time because
+# weekly_audit.py calls load_dotenv() after importing the tools.
+_TG_ENV = None
+
+
+def _tg_env():
+    global _TG_ENV
+    if _TG_ENV is None:
+        token = os.environ.get("TELEGRAM_BOT_TOKEN")
+        chat_id = os.environ.get("TELEGRAM_CHAT_ID")
+        base_url = f"https://api.telegram.org/bot{token}" if token else None
+        if not token:
+            return token, chat_id, base_url  # don't pin a missing token
+        _TG_ENV = (token, chat_id, base_url)
+    return _TG_ENV
+
+
+def refresh_env() -> None:
+    """Forget the cached Telegram settings (e.g. after changing os.environ)."""
+    global _TG_ENV
+    _TG_ENV = None
+
+
+def get_tg_session() -> requests.Session:
+    """The session used for Telegram calls (single seam for swapping in a mock)."""
+    return SYNC_SESSION
+
 
 def telegram_send(text: str) -> dict:
     """
@@ -13,10 +62,10 @@ def telegram_send(text: str) -> dict:
     Returns:
         dict
     """
+    global _LAST_SEND_DATE
     print("[Tools] Notifying User of:", text)
     try:
-        token = os.environ.get("TELEGRAM_BOT_TOKEN")
-        chat_id = os.environ.get("TELEGRAM_CHAT_ID")
+        token, chat_id, base_url = _tg_env()
 
         if not token or not chat_id:
             return {
@@ -30,19 +79,15 @@ def telegram_send(text: str) -> dict:
                 "error": "telegram_send error: 'text' is required",
             }
 
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
+        url = f"{base_url}/sendMessage"
 
-        safe_text = f"<pre>{html.escape(text)}</pre>"
+        body = _json_dumps({
+            "chat_id": chat_id,
+            "text": f"<pre>{html.escape(text)}</pre>",
+            "parse_mode": "HTML",
+        })
 
-        r = requests.post(
-            url,
-            json={
-                "chat_id": chat_id,
-                "text": safe_text,
-                "parse_mode": "HTML",
-            },
-            timeout=20,
-        )
+        r = get_tg_session().post(url, data=body, headers=_JSON_HEADERS, timeout=20)
 
         if r.status_code != 200:
             return {
@@ -50,6 +95,10 @@ def telegram_send(text: str) -> dict:
                 "error": f"telegram_send error: Telegram API failed ({r.status_code}): {r.text}",
             }
 
+        sent_date = ((r.json() or {}).get("result") or {}).get("date")
+        if isinstance(sent_date, int):
+            _LAST_SEND_DATE = sent_date
+
         return {"ok": True, "sent": True}
 
     except Exception as e:
@@ -66,30 +115,40 @@ def _read_last_update_id(path: str = "memory/update_id.txt") -> int:
         return 0
 
 
+# path -> last value written this process, so unchanged ids skip the disk.
+_LAST_WRITTEN = {}
+
+
 def _write_last_update_id(last_update_id: int, path: str = "memory/update_id.txt") -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(str(int(last_update_id)))
+    value = int(last_update_id)
+    if _LAST_WRITTEN.get(path) == value:
+        return
+    if path not in _LAST_WRITTEN:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Temp file + rename: a crash mid-write never leaves an empty counter.
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(str(value))
+    os.replace(tmp, path)
+    _LAST_WRITTEN[path] = value
 
 
 def _get_latest_update_id_from_telegram() -> int:
     try:
-        token = os.environ.get("TELEGRAM_BOT_TOKEN")
+        token, _, base_url = _tg_env()
         if not token:
             return 0
 
-        url = f"https://api.telegram.org/bot{token}/getUpdates"
-        r = requests.get(url, params={"timeout": 0}, timeout=20)
+        url = f"{base_url}/getUpdates"
+        # offset=-1 returns only the newest buffered update.
+        r = get_tg_session().get(url, params={"timeout": 0, "offset": -1, "limit": 1}, timeout=20)
         if r.status_code != 200:
             return 0
 
         results = (r.json() or {}).get("result", [])
-        latest = 0
-        for upd in results:
-            uid = upd.get("update_id")
-            if isinstance(uid, int) and uid > latest:
-                latest = uid
-        return latest
+        uid = results[0].get("update_id") if results else None
+        return uid if isinstance(uid, int) else 0
     except Exception:
         return 0
     
@@ -104,8 +163,8 @@ def telegram_get_response(
     Poll Telegram for a response message, remembering the last processed update_id in memory/update_id.txt.
 
     Args:
-        timeout_seconds: int (max time to wait; default 1800)
-        poll_interval_seconds: int (seconds between polls; default 300)
+        timeout_seconds: int (max time to wait; default 3600)
+        poll_interval_seconds: int (how long each long poll is held open, capped at 50; default 20)
         require_chat_id: bool (if True, only accept messages from TELEGRAM_CHAT_ID)
 
     Returns:
@@ -116,27 +175,35 @@ def telegram_get_response(
     """
     print("[Tools] Awaiting Telegram Response . . .")
     try:
-        token = os.environ.get("TELEGRAM_BOT_TOKEN")
-        chat_id_env = os.environ.get("TELEGRAM_CHAT_ID")
+        token, chat_id_env, base_url = _tg_env()
 
         if not token:
             return {"ok": False, "error": "telegram_get_response error: Missing TELEGRAM_BOT_TOKEN"}
         if require_chat_id and not chat_id_env:
             return {"ok": False, "error": "telegram_get_response error: Missing TELEGRAM_CHAT_ID"}
 
-        url = f"https://api.telegram.org/bot{token}/getUpdates"
+        url = f"{base_url}/getUpdates"
         deadline = time.time() + max(1, int(timeout_seconds))
 
-        baseline = _get_latest_update_id_from_telegram()
-        last_update_id = baseline
+        # Only messages sent after our last send count as a reply; older ones
+        # still buffered from the id on disk are skipped by date. Without a
+        # send this process, fall back to "newer than now" via one lookup.
+        min_date = _LAST_SEND_DATE
+        baseline = _get_latest_update_id_from_telegram() if min_date is None else 0
+        last_update_id = max(baseline, _read_last_update_id())
+        persisted_id = last_update_id
         offset = last_update_id + 1 if last_update_id else None
 
         while time.time() < deadline:
-            params = {"timeout": 0}
+            # Long poll: Telegram answers as soon as a message arrives, so
+            # there is no sleep between requests.
+            remaining = int(deadline - time.time())
+            hold = min(TELEGRAM_LONG_POLL_MAX_S, max(1, int(poll_interval_seconds)), max(1, remaining))
+            params = {"timeout": hold}
             if offset is not None:
                 params["offset"] = offset
 
-            r = requests.get(url, params=params, timeout=20)
+            r = get_tg_session().get(url, params=params, timeout=hold + 10)
             if r.status_code != 200:
                 return {"ok": False, "error": f"telegram_get_response error: HTTP {r.status_code}: {r.text}"}
 
@@ -155,6 +222,8 @@ def telegram_get_response(
 
                 if not text:
                     continue
+                if min_date is not None and msg.get("date", 0) < min_date:
+                    continue
                 if require_chat_id and chat_id_env and chat_id != str(chat_id_env):
                     continue
 
@@ -162,7 +231,10 @@ def telegram_get_response(
                 print("[Tools] Message Received.")
                 return {"ok": True, "update_id": last_update_id, "text": text, "chat_id": chat_id}
 
-            time.sleep(max(1, int(poll_interval_seconds)))
+            # Record progress as it happens so a crash doesn't replay updates.
+            if last_update_id != persisted_id:
+                _write_last_update_id(last_update_id)
+                persisted_id = last_update_id
 
         _write_last_update_id(last_update_id)
         print(f"[Tools] Telegram Timeout - No Response within {timeout_seconds / 60} minutes.")
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import json
 import os
+import re
 import shutil
+import threading
 import time
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
@@ -10,6 +14,36 @@ from langchain.tools import tool
 
 from tools.fs_tools import shell_run
 
+SANDBOX_ROOT = ".sandbox_repos"
+
+# Gems are installed once into a cache shared by every sandbox (bundler
+# already namespaces it by Ruby version), not into each repo's vendor/bundle.
+BUNDLE_CACHE_DIR = os.path.join(SANDBOX_ROOT, "_bundle")
+
+# Per-sandbox record of the last commit that verified OK. Re-verifying the
+# same commit with the same verifier code is skipped; editing this file
+# changes _VERIFIER_STAMP and so invalidates every record.
+VERIFY_CACHE_FILE = ".verify_cache.json"
+_VERIFIER_STAMP = os.stat(__file__).st_mtime_ns
+
+# One lock per sandbox so a background run and repo_verify never run git or
+# bundler in the same checkout at once.
+_SANDBOX_LOCKS: Dict[str, threading.Lock] = {}
+_SANDBOX_LOCKS_GUARD = threading.Lock()
+
+# Parallel gem installs; bundler defaults to one at a time.
+BUNDLE_JOBS = max(2, os.cpu_count() or 2)
+
+# Install/build steps can print megabytes; only the tail (where errors end
+# up) is kept in memory and returned to the agent.
+STEP_TAIL_CHARS = 4_000
+
+# Full commit ids can't be cloned with --branch; they are fetched by id
+# instead. Git can't fetch an abbreviated id, so a short hex ref is tried as
+# a branch/tag first and only then resolved against the fetched history.
+_FULL_SHA_RE = re.compile(r"[0-9a-f]{40}")
+_SHORT_SHA_RE = re.compile(r"[0-9a-f]{7,39}")
+
 
 # -----------------------------
 # Helpers
@@ -47,6 +81,63 @@ def _step(name: str, r: Dict[str, Any], extra: Optional[Dict[str, Any]] = None)
     return s
 
 
+def _result(
+    repo_url: str,
+    ref: Optional[str],
+    repo_dir: Path,
+    steps: List[Dict[str, Any]],
+    error: Optional[str] = None,
+) -> Dict[str, Any]:
+    """verify_repo's return shape; any error makes it a failure."""
+    res = {
+        "ok": error is None,
+        "repo_url": repo_url,
+        "ref": ref,
+        "workdir": str(repo_dir),
+        "steps": steps,
+    }
+    if error is not None:
+        res["error"] = error
+    return res
+
+
+def _read_verify_cache(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_verify_cache(path: Path, record: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(".tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # only an optimization
+
+
+def _checkout_abbrev_sha(repo_dir: Path, ref: str, steps: List[Dict[str, Any]]) -> Optional[str]:
+    """Fetch branch history (commits/trees only) and check out a short sha; returns an error or None."""
+    unshallow = ["--unshallow"] if (repo_dir / ".git" / "shallow").exists() else []
+    r = shell_run(
+        ["git", "fetch", *unshallow, "origin", "+refs/heads/*:refs/remotes/origin/*"],
+        cwd=str(repo_dir),
+        timeout_s=600,
+    )
+    steps.append(_step("fetch_history", r))
+    if not _ok(r):
+        return "verify_repo: git fetch failed"
+
+    r = shell_run(["git", "checkout", "--detach", ref], cwd=str(repo_dir), timeout_s=120)
+    steps.append(_step("checkout", r, {"ref": ref}))
+    if not _ok(r):
+        return f"verify_repo: git checkout failed for ref={ref}"
+    return None
+
+
 def _ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
@@ -57,13 +148,24 @@ def _safe_sandbox_dir(sandbox_key: str) -> str:
     return cleaned or f"sandbox_{int(time.time())}"
 
 
+def _sandbox_lock(sandbox_name: str) -> threading.Lock:
+    with _SANDBOX_LOCKS_GUARD:
+        return _SANDBOX_LOCKS.setdefault(sandbox_name, threading.Lock())
+
+
 # -----------------------------
 # Core verifier
 # -----------------------------
 
-def verify_repo(repo_url: str, ref: Optional[str] = None, sandbox_key: str = "default") -> Dict[str, Any]:
+def verify_repo(
+    repo_url: str,
+    ref: Optional[str] = None,
+    sandbox_key: str = "default",
+    build: bool = True,
+) -> Dict[str, Any]:
     """
     Verify a repo can be fetched/checked out and (if applicable) built.
+    With build=False it stops after the checkout (repo_prefetch).
 
     Returns:
       {
@@ -80,10 +182,46 @@ def verify_repo(repo_url: str, ref: Optional[str] = None, sandbox_key: str = "de
     if not repo_url or not isinstance(repo_url, str):
         return {"ok": False, "error": "verify_repo: repo_url is required", "steps": steps}
 
-    base = Path(".sandbox_repos")
+    sandbox_name = _safe_sandbox_dir(sandbox_key)
+    with _sandbox_lock(sandbox_name):
+        return _verify_in_sandbox(repo_url, ref, sandbox_name, steps, build)
+
+
+def verify_repo_async(
+    repo_url: str,
+    ref: Optional[str] = None,
+    sandbox_key: str = "default",
+    build: bool = True,
+) -> Future:
+    """
+    Run verify_repo on a daemon thread; the Future resolves to its result
+    dict. Daemon, so an unfinished background run never holds up exit.
+    """
+    future: Future = Future()
+
+    def _run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(verify_repo(repo_url, ref, sandbox_key, build))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=_run, name=f"verify-{sandbox_key}", daemon=True).start()
+    return future
+
+
+def _verify_in_sandbox(
+    repo_url: str,
+    ref: Optional[str],
+    sandbox_name: str,
+    steps: List[Dict[str, Any]],
+    build: bool = True,
+) -> Dict[str, Any]:
+    base = Path(SANDBOX_ROOT)
     _ensure_dir(base)
 
-    sandbox_dir = base / _safe_sandbox_dir(sandbox_key)
+    sandbox_dir = base / sandbox_name
     _ensure_dir(sandbox_dir)
 
     repo_dir = sandbox_dir / "repo"
@@ -92,112 +230,103 @@ def verify_repo(repo_url: str, ref: Optional[str] = None, sandbox_key: str = "de
     if repo_dir.exists() and not (repo_dir / ".git").exists():
         shutil.rmtree(repo_dir, ignore_errors=True)
 
-    # Clone or fetch
-    if not repo_dir.exists():
-        r = shell_run(["git", "clone", repo_url, str(repo_dir)], cwd=str(sandbox_dir), timeout_s=600)
+    # Clone or fetch. Only the requested commit is needed, so both paths are
+    # shallow; a branch/tag ref is checked out by the clone itself.
+    maybe_short_sha = bool(ref) and bool(_SHORT_SHA_RE.fullmatch(ref))
+    need_fetch = True
+    fresh_clone = not repo_dir.exists()
+    if fresh_clone:
+        clone_cmd = ["git", "clone", "--depth=1", "--filter=blob:none", "--single-branch"]
+        branch_args = ["--branch", ref] if ref and not _FULL_SHA_RE.fullmatch(ref) else []
+        r = shell_run([*clone_cmd, *branch_args, repo_url, repo_dir.name], cwd=str(sandbox_dir), timeout_s=600)
         steps.append(_step("clone", r))
+        checked_out = bool(branch_args)
+
+        if not _ok(r) and maybe_short_sha:
+            # Not a branch/tag: clone the default branch, then resolve the short sha.
+            r = shell_run([*clone_cmd, repo_url, repo_dir.name], cwd=str(sandbox_dir), timeout_s=600)
+            steps.append(_step("clone_default", r))
+            if _ok(r):
+                error = _checkout_abbrev_sha(repo_dir, ref, steps)
+                if error:
+                    return _result(repo_url, ref, repo_dir, steps, error)
+                checked_out = True
+
         if not _ok(r):
-            return {
-                "ok": False,
-                "repo_url": repo_url,
-                "ref": ref,
-                "workdir": str(repo_dir),
-                "steps": steps,
-                "error": "verify_repo: git clone failed",
-            }
-    else:
-        r = shell_run(["git", "fetch", "--all", "--prune"], cwd=str(repo_dir), timeout_s=600)
+            return _result(repo_url, ref, repo_dir, steps, "verify_repo: git clone failed")
+        need_fetch = bool(ref) and not checked_out
+
+    if need_fetch:
+        r = shell_run(["git", "fetch", "--depth=1", "origin", ref or "HEAD"], cwd=str(repo_dir), timeout_s=600)
         steps.append(_step("fetch", r))
-        if not _ok(r):
-            return {
-                "ok": False,
-                "repo_url": repo_url,
-                "ref": ref,
-                "workdir": str(repo_dir),
-                "steps": steps,
-                "error": "verify_repo: git fetch failed",
-            }
-
-    # Checkout ref (optional)
-    if ref:
-        r1 = shell_run(["git", "checkout", ref], cwd=str(repo_dir), timeout_s=120)
-        steps.append(_step("checkout", r1, {"ref": ref}))
-
-        if not _ok(r1):
-            # Fallback to origin/<ref>
-            r2 = shell_run(["git", "checkout", f"origin/{ref}"], cwd=str(repo_dir), timeout_s=120)
-            steps.append(_step("checkout_origin", r2, {"ref": f"origin/{ref}"}))
-            if not _ok(r2):
-                return {
-                    "ok": False,
-                    "repo_url": repo_url,
-                    "ref": ref,
-                    "workdir": str(repo_dir),
-                    "steps": steps,
-                    "error": f"verify_repo: git checkout failed for ref={ref}",
-                }
-
-    # Ensure clean working tree (after checkout)
-    r = shell_run(["git", "status", "--porcelain"], cwd=str(repo_dir), timeout_s=60)
-    steps.append(_step("git_status_porcelain", r))
-    if _ok(r) and (r.get("stdout") or "").strip():
-        return {
-            "ok": False,
-            "repo_url": repo_url,
-            "ref": ref,
-            "workdir": str(repo_dir),
-            "steps": steps,
-            "error": "verify_repo: working tree not clean after checkout/fetch",
-        }
+        if not _ok(r) and maybe_short_sha:
+            error = _checkout_abbrev_sha(repo_dir, ref, steps)
+            if error:
+                return _result(repo_url, ref, repo_dir, steps, error)
+        elif not _ok(r):
+            return _result(repo_url, ref, repo_dir, steps, "verify_repo: git fetch failed")
+        else:
+            # FETCH_HEAD is exactly what was asked for (branch tip, tag or sha).
+            r = shell_run(["git", "checkout", "--detach", "FETCH_HEAD"], cwd=str(repo_dir), timeout_s=120)
+            steps.append(_step("checkout", r, {"ref": ref or "HEAD"}))
+            if not _ok(r):
+                return _result(repo_url, ref, repo_dir, steps, f"verify_repo: git checkout failed for ref={ref}")
+
+    # Ensure clean working tree (after checkout). A fresh clone can't be
+    # dirty, so only a reused sandbox pays for this extra git process.
+    if not fresh_clone:
+        r = shell_run(["git", "status", "--porcelain"], cwd=str(repo_dir), timeout_s=60)
+        steps.append(_step("git_status_porcelain", r))
+        if _ok(r) and (r.get("stdout") or "").strip():
+            return _result(repo_url, ref, repo_dir, steps, "verify_repo: working tree not clean after checkout/fetch")
+
+    if not build:
+        return _result(repo_url, ref, repo_dir, steps)
+
+    # Same commit already verified by this verifier: skip install/build.
+    r = shell_run(["git", "rev-parse", "HEAD"], cwd=str(repo_dir), timeout_s=60)
+    head_sha = (r.get("stdout") or "").strip() if _ok(r) else ""
+    cache_path = sandbox_dir / VERIFY_CACHE_FILE
+    record = {"sha": head_sha, "verifier": _VERIFIER_STAMP}
+    if head_sha and _read_verify_cache(cache_path) == record:
+        steps.append(_step("cache_hit", {"ok": True, "returncode": 0, "stdout": f"{head_sha} already verified"}))
+        return _result(repo_url, ref, repo_dir, steps)
 
     # Build checks
     # Jekyll (Gemfile present)
     gemfile = repo_dir / "Gemfile"
     if gemfile.exists():
-        # bundle install (local path to avoid global gem pollution)
-        bundle_path = repo_dir / "vendor" / "bundle"
+        # bundle install into the shared cache (still avoids global gem pollution)
+        bundle_path = Path(BUNDLE_CACHE_DIR).resolve()
         _ensure_dir(bundle_path)
+        bundle_env = {"BUNDLE_PATH": str(bundle_path)}
 
         r = shell_run(
-            ["bundle", "install", "--path", str(bundle_path)],
+            ["bundle", "install", f"--jobs={BUNDLE_JOBS}"],
             cwd=str(repo_dir),
             timeout_s=1200,
+            max_output_chars=STEP_TAIL_CHARS,
+            env=bundle_env,
         )
         steps.append(_step("bundle_install", r))
         if not _ok(r):
-            return {
-                "ok": False,
-                "repo_url": repo_url,
-                "ref": ref,
-                "workdir": str(repo_dir),
-                "steps": steps,
-                "error": "verify_repo: bundle install failed (is Ruby/Bundler installed?)",
-            }
+            return _result(repo_url, ref, repo_dir, steps, "verify_repo: bundle install failed (is Ruby/Bundler installed?)")
 
         # jekyll build
         r = shell_run(
             ["bundle", "exec", "jekyll", "build"],
             cwd=str(repo_dir),
             timeout_s=1200,
+            max_output_chars=STEP_TAIL_CHARS,
+            env=bundle_env,
         )
         steps.append(_step("jekyll_build", r))
         if not _ok(r):
-            return {
-                "ok": False,
-                "repo_url": repo_url,
-                "ref": ref,
-                "workdir": str(repo_dir),
-                "steps": steps,
-                "error": "verify_repo: jekyll build failed",
-            }
-
-    return {
-        "ok": True,
-        "repo_url": repo_url,
-        "ref": ref,
-        "workdir": str(repo_dir),
-        "steps": steps,
-    }
+            return _result(repo_url, ref, repo_dir, steps, "verify_repo: jekyll build failed")
+
+    if head_sha:
+        _write_verify_cache(cache_path, record)
+    return _result(repo_url, ref, repo_dir, steps)
 
 
 # -----------------------------
@@ -210,9 +339,39 @@ def repo_verify(repo_url: str, ref: str = "", sandbox_key: str = "default") -> d
     Verify a repo by cloning/fetching and running build checks.
     Args:
       repo_url: e.g. "https://github.com/TristanTA/tristan-allen-portfolio"
-      ref: optional git ref (branch/sha). If empty, uses default branch.
+      ref: optional git ref (branch/tag/sha; a short sha costs a history fetch). If empty, uses default branch.
       sandbox_key: stable key for caching clone between runs.
     """
     ref_norm = ref.strip() or None
     print("[Tools] Verifying Repo", repo_url)
-    return verify_repo(repo_url=repo_url, ref=ref_norm, sandbox_key=sandbox_key)
\ No newline at end of file
+    return verify_repo(repo_url=repo_url, ref=ref_norm, sandbox_key=sandbox_key)
+
+
+def _log_prefetch(future: Future) -> None:
+    # Nobody waits on a prefetch, so surface its failures here.
+    try:
+        result = future.result()
+    except Exception as e:
+        print(f"[Tools] Prefetch failed: {type(e).__name__}: {e}")
+        return
+    if not result.get("ok"):
+        print(f"[Tools] Prefetch failed: {result.get('error')}")
+
+
+@tool
+def repo_prefetch(repo_url: str, ref: str = "", sandbox_key: str = "default") -> dict:
+    """
+    Start cloning/fetching a repo in the background and return immediately.
+    Call this as soon as the target repo is known: the network work then
+    overlaps with the rest of the run, and a later repo_verify with the same
+    sandbox_key starts from a warm checkout (it waits for this if still
+    going). Installs and builds are left to repo_verify.
+    Args:
+      repo_url, ref, sandbox_key: same as repo_verify.
+    """
+    print("[Tools] Prefetching Repo", repo_url)
+    if not repo_url:
+        return {"ok": False, "error": "repo_prefetch error: repo_url is required"}
+    future = verify_repo_async(repo_url=repo_url, ref=ref.strip() or None, sandbox_key=sandbox_key, build=False)
+    future.add_done_callback(_log_prefetch)
+    return {"ok": True, "started": True, "repo_url": repo_url, "sandbox_key": sandbox_key}
\ No newline at end of file
@@ -14,7 +14,7 @@ Goals
 - Keep code extremely simple and straightforward. Less is better. We can improve robustness later.
 
 Workflow
-1) Identify the portfolio repo (or use the configured default).
+1) Identify the portfolio repo (or use the configured default), then call repo_prefetch on it so verification later starts warm.
 2) Scan for “future plans”, “roadmap”, “next steps”, “TODO”, “planned”, etc. Capture the intended direction.
 3) Choose the top 1 to 3 issues that most block that direction:
    - broken links / broken builds